@@ -0,0 +1,32 @@
+"""products active id desc
+
+Revision ID: 2675edc4d73c
+Revises: 331bdf90280f
+Create Date: 2026-10-14 11:47:09.930412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2675edc4d73c'
+down_revision: Union[str, Sequence[str], None] = '331bdf90280f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # покрывающий частичный индекс под дефолтную витрину:
+    # WHERE is_active ORDER BY id DESC LIMIT n
+    op.create_index('ix_products_active_id_desc', 'products', ['is_active', sa.text('id DESC')], unique=False, postgresql_include=['title', 'slug', 'price', 'currency', 'stock', 'category_id'], postgresql_where=sa.text('is_active'))
+    op.drop_index('ix_products_active', table_name='products')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_products_active', 'products', ['is_active'], unique=False)
+    op.drop_index('ix_products_active_id_desc', table_name='products', postgresql_include=['title', 'slug', 'price', 'currency', 'stock', 'category_id'], postgresql_where=sa.text('is_active'))
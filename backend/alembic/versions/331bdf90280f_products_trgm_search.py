@@ -0,0 +1,33 @@
+"""products trgm search
+
+Revision ID: 331bdf90280f
+Revises: 4af902971c6b
+Create Date: 2026-10-14 11:02:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '331bdf90280f'
+down_revision: Union[str, Sequence[str], None] = '4af902971c6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ILIKE '%q%' в list_products не может использовать b-tree;
+    # GIN по триграммам планировщик подхватывает для него сам
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_products_title_trgm', 'products', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_products_desc_trgm', 'products', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_desc_trgm', table_name='products', postgresql_using='gin')
+    op.drop_index('ix_products_title_trgm', table_name='products', postgresql_using='gin')
+    # расширение не удаляем: им могут пользоваться другие объекты БД
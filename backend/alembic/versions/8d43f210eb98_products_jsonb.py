@@ -0,0 +1,50 @@
+"""products jsonb
+
+Revision ID: 8d43f210eb98
+Revises: e84d21fec001
+Create Date: 2026-10-14 13:05:17.662840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d43f210eb98'
+down_revision: Union[str, Sequence[str], None] = 'e84d21fec001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # json → jsonb; JSON-литерал null (так писал старый тип JSON) → SQL NULL
+    op.alter_column('products', 'images',
+               existing_type=sa.JSON(),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using="NULLIF(images::jsonb, 'null'::jsonb)")
+    op.alter_column('products', 'attributes',
+               existing_type=sa.JSON(),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using="NULLIF(attributes::jsonb, 'null'::jsonb)")
+    op.create_index('ix_products_attrs_gin', 'products', ['attributes'], unique=False, postgresql_using='gin', postgresql_ops={'attributes': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_attrs_gin', table_name='products', postgresql_using='gin')
+    op.alter_column('products', 'attributes',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=sa.JSON(),
+               existing_nullable=True,
+               postgresql_using='attributes::json')
+    op.alter_column('products', 'images',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=sa.JSON(),
+               existing_nullable=True,
+               postgresql_using='images::json')
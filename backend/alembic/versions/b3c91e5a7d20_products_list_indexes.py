@@ -0,0 +1,31 @@
+"""products list indexes
+
+Revision ID: b3c91e5a7d20
+Revises: e4db402d8e0e
+Create Date: 2026-10-14 15:08:12.640931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c91e5a7d20'
+down_revision: Union[str, Sequence[str], None] = 'e4db402d8e0e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # витрина категории: по n строк id DESC на каждую категорию поддерева (LATERAL в list_products)
+    op.create_index('ix_products_active_cat_id', 'products', ['is_active', 'category_id', sa.text('id DESC')], unique=False)
+    op.create_index('ix_products_price', 'products', ['price'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_price', table_name='products')
+    op.drop_index('ix_products_active_cat_id', table_name='products')
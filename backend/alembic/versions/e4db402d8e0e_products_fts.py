@@ -0,0 +1,35 @@
+"""products fts
+
+Revision ID: e4db402d8e0e
+Revises: 8d43f210eb98
+Create Date: 2026-10-14 14:21:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4db402d8e0e'
+down_revision: Union[str, Sequence[str], None] = '8d43f210eb98'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # STORED-колонка: Postgres сам пересчитывает её при INSERT/UPDATE title/description
+    op.add_column('products', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('russian', coalesce(title, '') || ' ' || coalesce(description, ''))", persisted=True), nullable=True))
+    op.create_index('ix_products_fts', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+    # описание теперь ищется через search_vector — триграммы по нему не нужны
+    op.drop_index('ix_products_desc_trgm', table_name='products', postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_products_desc_trgm', 'products', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+    op.drop_index('ix_products_fts', table_name='products', postgresql_using='gin')
+    op.drop_column('products', 'search_vector')
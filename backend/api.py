@@ -2,23 +2,40 @@
 from __future__ import annotations
 
 import os
-import json
 import re
+import time
+import unicodedata
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Union
+from typing import Annotated, Any, Dict, List, Optional, Union
 
+import orjson
 from fastapi import (
     APIRouter,
     Depends,
     Header,
     HTTPException,
     Request,
+    Response,
     status,
     Query,
 )
-from pydantic import BaseModel, Field, conint, field_validator
-from sqlalchemy import select, delete, and_, or_
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    StringConstraints,
+    TypeAdapter,
+    ValidationError,
+    ValidationInfo,
+    conint,
+    field_validator,
+)
+from sqlalchemy import Float, Select, case, cast, select, insert, update, delete, or_, func, text, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.models import User, Category, Product
@@ -29,29 +46,23 @@ router = APIRouter(tags=["api"])
 # Доступ к сессии и права
 # ──────────────────────────────────────────────────────────────────────────────
 
-def _parse_moder_ids(raw: str) -> List[int]:
-    out: List[int] = []
-    for part in (raw or "").split(","):
-        p = part.strip()
-        if not p:
-            continue
-        try:
-            out.append(int(p))
-        except ValueError:
-            continue
-    return out
+def _parse_moder_ids(raw: str) -> frozenset[int]:
+    # "1, 2,,x,12abc" → {1, 2}: мусорные куски пропускаем без try/except
+    return frozenset(
+        int(p) for p in map(str.strip, (raw or "").split(",")) if p.removeprefix("-").isdecimal()
+    )
 
-MODERATOR_IDS: List[int] = _parse_moder_ids(os.getenv("MODERATOR_IDS", ""))
+MODERATOR_IDS: frozenset[int] = _parse_moder_ids(os.getenv("MODERATOR_IDS", ""))
 
 
 async def get_session(request: Request) -> AsyncSession:
-    sm = getattr(request.app.state, "sessionmaker", None)
-    if sm is None:
+    # сессию на запрос открывает middleware DBSessionPerRequest в main.py
+    session = getattr(request.state, "session", None)
+    if session is None:
         raise RuntimeError(
-            "Sessionmaker не найден. В main.py положи: app.state.sessionmaker = SessionLocal"
+            "Сессия БД не открыта. Нужен DATABASE_URL и middleware DBSessionPerRequest из main.py"
         )
-    async with sm() as session:  # type: AsyncSession
-        yield session
+    return session
 
 
 async def get_tg_id(
@@ -73,44 +84,91 @@ async def require_admin(tg_id: Optional[int] = Depends(get_tg_id)) -> int:
 # Утилиты нормализации
 # ──────────────────────────────────────────────────────────────────────────────
 
-_slug_re = re.compile(r"[^a-z0-9\-]+")
+# любой пробег не-[a-z0-9] (пробелы, знаки, повторные дефисы) → один "-"
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
 
 def slugify(value: str) -> str:
-    v = (value or "").strip().lower()
-    v = re.sub(r"\s+", "-", v)
-    v = _slug_re.sub("-", v)
-    v = re.sub(r"-{2,}", "-", v).strip("-")
-    return v or "item"
-
-async def parse_json_or_form(request: Request, allowed_fields: List[str]) -> Dict[str, Any]:
-    ctype = (request.headers.get("content-type") or "").lower()
+    v = value or ""
+    if not v.isascii():
+        # "café" → "cafe": диакритику отбрасываем, а не теряем букву целиком
+        v = unicodedata.normalize("NFKD", v).encode("ascii", "ignore").decode()
+    return _SLUG_RE.sub("-", v.lower()).strip("-") or "item"
+
+async def parse_json_or_form(request: Request, allowed_fields: frozenset[str]) -> Dict[str, Any]:
+    ctype = request.headers.get("content-type", "")
+    if not ctype.startswith("application/json"):  # частый случай — без lower()
+        ctype = ctype.lower()
     if "application/json" in ctype:
-        data = await request.json()
+        # orjson вместо json.loads внутри request.json(): тот же результат, быстрее
+        try:
+            data = orjson.loads(await request.body())
+        except orjson.JSONDecodeError as e:
+            raise HTTPException(422, "invalid JSON payload") from e
         if not isinstance(data, dict):
             raise HTTPException(422, "JSON payload must be an object")
-    elif "multipart/form-data" in ctype or "application/x-www-form-urlencoded" in ctype:
+        return {k: data[k] for k in data.keys() & allowed_fields}
+    if "multipart/form-data" in ctype or "application/x-www-form-urlencoded" in ctype:
         form = await request.form()
-        data = {k: form.get(k) for k in allowed_fields if k in form}
-    else:
-        raise HTTPException(415, "Unsupported Media Type")
-    return {k: v for k, v in data.items() if k in allowed_fields}
+        return {k: form[k] for k in form.keys() & allowed_fields}
+    raise HTTPException(415, "Unsupported Media Type")
+
+def validate_or_422(model: type[BaseModel], raw: Dict[str, Any] | bytes) -> Any:
+    """Разобрать raw (dict из формы или сырое JSON-тело) схемой; ошибки — обычным 422 FastAPI."""
+    try:
+        if isinstance(raw, bytes):
+            # pydantic-core разбирает JSON и валидирует поля за один проход, без промежуточного dict
+            return model.model_validate_json(raw)
+        return model.model_validate(raw)
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_context=False)
+        for err in errors:
+            err["loc"] = ("body", *err["loc"])
+            # битое JSON-тело (в т.ч. не UTF-8) pydantic отдаёт в input сырыми
+            # байтами — jsonable_encoder их не закодирует, да и эхо тела не нужно
+            if isinstance(err.get("input"), bytes):
+                del err["input"]
+        raise RequestValidationError(errors) from e
+
+async def parse_model_or_422(request: Request, model: type[BaseModel], allowed_fields: frozenset[str]) -> Any:
+    """
+    Тело запроса сразу в схему. JSON-тело отдаём схеме байтами (лишние поля
+    она отбрасывает сама — extra="ignore"), форму — через parse_json_or_form.
+    """
+    ctype = request.headers.get("content-type", "")
+    if ctype.startswith("application/json") or "application/json" in ctype.lower():
+        return validate_or_422(model, await request.body())
+    return validate_or_422(model, await parse_json_or_form(request, allowed_fields))
+
+_TRUTHY = frozenset({"1", "true", "on", "yes"})
 
 def to_bool(v: Any) -> bool:
-    if isinstance(v, bool):
+    # JSON даёт bool/int — без str(); строки (формы) сравниваем с _TRUTHY
+    if v is True or v is False:
         return v
     if v is None:
         return False
-    return str(v).strip().lower() in {"1", "true", "on", "yes"}
+    if isinstance(v, int):
+        return v != 0
+    return v.strip().lower() in _TRUTHY if isinstance(v, str) else False
 
 def to_int_or_none(v: Any) -> Optional[int]:
-    if v is None or str(v).strip() == "":
+    # типизированный JSON: int отдаём как есть, без str() и try
+    if type(v) is int:
+        return v
+    if v is None:
         return None
+    if isinstance(v, str):
+        v = v.strip()
+        if not v:
+            return None
     try:
         return int(v)
     except Exception:
         return None
 
 def to_float(v: Any) -> float:
+    if type(v) is float:
+        return v
     if isinstance(v, (int, float)):
         return float(v)
     s = str(v).strip().replace(",", ".")
@@ -126,8 +184,8 @@ def parse_json_field(v: Any) -> Optional[dict | list]:
     if isinstance(v, (dict, list)):
         return v
     try:
-        parsed = json.loads(str(v))
-    except Exception:
+        parsed = orjson.loads(v if isinstance(v, (str, bytes)) else str(v))
+    except orjson.JSONDecodeError:
         return None
     return parsed if isinstance(parsed, (dict, list)) else None
 
@@ -144,13 +202,56 @@ def safe_attrs(v: Any) -> Optional[Union[Dict[str, Any], List[Any]]]:
     return None
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Быстрые ответы для GET: dict → orjson, без jsonable_encoder и повторной
+# валидации (Response FastAPI отдаёт как есть). У таких роутов
+# response_model=None, а схема для /docs — через responses={200: {"model": ...}}
+# ──────────────────────────────────────────────────────────────────────────────
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+# Колонки карточки товара (список и GET по id): tuple-select без ORM-гидратации
+# (identity map, отслеживание состояния). Состав = ProductOut — витрина
+# фильтрует по description и рисует images на клиенте. Приведение типов к
+# ProductOut делает сам Postgres (numeric → float8, jsonb не того вида → NULL).
+# Исключение — images: старые строки хранят элементы как прислали
+# ([" http://x ", ""], не-строки), поэтому _product_row пропускает их через
+# safe_images — тот же strip/отбор пустых, что у ответов create/update (ProductOut).
+_PRODUCT_COLUMNS = (
+    Product.id,
+    Product.title,
+    Product.slug,
+    Product.description,
+    cast(Product.price, Float).label("price"),
+    Product.currency,
+    Product.stock,
+    Product.is_active,
+    Product.images,
+    case(
+        (func.jsonb_typeof(Product.attributes).in_(("object", "array")), Product.attributes)
+    ).label("attributes"),
+    Product.category_id,
+)
+
+
+def _product_row(m: Any) -> Dict[str, Any]:
+    row = dict(m)
+    row["images"] = safe_images(row["images"])
+    return row
+
+
+_CATEGORY_COLUMNS = (Category.id, Category.name, Category.slug, Category.parent_id)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Pydantic-схемы
 # ──────────────────────────────────────────────────────────────────────────────
 
 # Users
 class EnsureUserIn(BaseModel):
-    tg_id: conint(gt=0)
+    tg_id: conint(gt=0, lt=2**63)
 
 class EnsureUserOut(BaseModel):
     id: int
@@ -164,101 +265,145 @@ class CategoryIn(BaseModel):
     slug: str = Field(..., max_length=200)
     parent_id: Optional[int] = None
 
+class CategoryPatch(BaseModel):
+    name: Optional[str] = Field(None, max_length=200)
+    slug: Optional[str] = Field(None, max_length=200)
+    parent_id: Optional[int] = None
+
+    @field_validator("name", "slug", mode="before")
+    @classmethod
+    def _required(cls, v: Any, info: ValidationInfo) -> str:
+        v = str(v or "").strip()
+        if not v:
+            raise ValueError(f"{info.field_name} is required")
+        return v
+
+    @field_validator("parent_id", mode="before")
+    @classmethod
+    def _parent(cls, v: Any) -> Optional[int]:
+        return to_int_or_none(v)
+
 class CategoryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     slug: str
     parent_id: Optional[int]
 
 # Products
+_Title = Annotated[str, StringConstraints(min_length=1, max_length=255)]
+_Currency = Annotated[str, StringConstraints(to_upper=True, min_length=3, max_length=3)]
+
 class ProductIn(BaseModel):
-    title: str = Field(..., max_length=255)
+    model_config = ConfigDict(str_strip_whitespace=True, extra="ignore")
+
+    title: _Title
     slug: Optional[str] = Field(None, max_length=255)
     description: Optional[str] = None
-    price: float = Field(ge=0)
-    currency: str = Field("RUB", min_length=3, max_length=3)
+    # как в форме админки: нет цены — 0, неотмеченный чекбокс не приходит вовсе — False
+    price: float = Field(0.0, ge=0)
+    currency: _Currency = "RUB"
     stock: int = Field(0, ge=0)
-    is_active: bool = True
+    is_active: bool = False
     images: Optional[List[str]] = None
     attributes: Optional[Dict[str, Any]] = None
     category_id: Optional[int] = None
 
-    @field_validator("title")
-    @classmethod
-    def _title(cls, v: str) -> str:
-        v = (v or "").strip()
-        if not v:
-            raise ValueError("title is required")
-        return v
-
-    @field_validator("slug")
+    # strip/длина/регистр — ограничениями типов в pydantic-core; ниже только то,
+    # чего они не умеют: строки формы ("12,5", "on", "", JSON-строки).
+    @field_validator("slug", "description", mode="before")
     @classmethod
-    def _slug(cls, v: Optional[str]) -> Optional[str]:
-        v = (v or "").strip()
-        return v or None
+    def _opt_str(cls, v: Any) -> Optional[str]:
+        return str(v or "").strip() or None
 
-    @field_validator("description")
+    @field_validator("price", mode="before")
     @classmethod
-    def _desc(cls, v: Optional[str]) -> Optional[str]:
-        return (v or "").strip() or None
+    def _price(cls, v: Any):
+        return 0.0 if v is None else to_float(v)
 
-    @field_validator("price")
+    @field_validator("stock", mode="before")
     @classmethod
-    def _price(cls, v):
+    def _stock(cls, v: Any):
         if isinstance(v, str):
-            v = v.strip().replace(",", ".")
-        return float(v)
+            v = v.strip() or "0"
+        return v
 
-    @field_validator("stock")
+    @field_validator("is_active", mode="before")
     @classmethod
-    def _stock(cls, v):
-        if isinstance(v, str):
-            v = v.strip() or "0"
-        return int(v)
+    def _active(cls, v: Any):
+        return to_bool(v)  # null → False
 
-    @field_validator("currency")
+    @field_validator("currency", mode="before")
     @classmethod
-    def _curr(cls, v: str) -> str:
-        v = (v or "RUB").strip().upper()
-        if len(v) != 3:
-            raise ValueError("currency must be 3 letters")
-        return v
+    def _curr(cls, v: Any) -> str:
+        return v if isinstance(v, str) and v.strip() else "RUB"
 
-    @field_validator("category_id")
+    @field_validator("category_id", mode="before")
     @classmethod
-    def _cat(cls, v):
-        if v in ("", None):
+    def _cat(cls, v: Any):
+        if v is None or (isinstance(v, str) and not v.strip()):
             return None
-        return int(v)
+        return v
 
-    @field_validator("images")
+    @field_validator("images", mode="before")
     @classmethod
-    def _images(cls, v):
+    def _images(cls, v: Any):
         if v is None or v == "":
             return None
         if isinstance(v, str):
-            parsed = parse_json_field(v)
-            if isinstance(parsed, list):
-                return [str(s).strip() for s in parsed if str(s).strip()]
-            return None
+            v = parse_json_field(v)
         if isinstance(v, list):
             return [str(s).strip() for s in v if str(s).strip()]
         return None
 
-    @field_validator("attributes")
+    @field_validator("attributes", mode="before")
     @classmethod
-    def _attrs(cls, v):
+    def _attrs(cls, v: Any):
         if v is None or v == "":
             return None
         if isinstance(v, str):
-            parsed = parse_json_field(v)
-            return parsed if isinstance(parsed, dict) else None
-        if isinstance(v, dict):
-            return v
-        return None
+            v = parse_json_field(v)
+        return v if isinstance(v, dict) else None
+
+
+class ProductPatch(ProductIn):
+    """PATCH: все поля необязательны; в UPDATE идут только присланные (exclude_unset)."""
+    title: Optional[_Title] = None
+    price: Optional[float] = Field(None, ge=0)
+    currency: Optional[_Currency] = None
+    stock: Optional[int] = Field(None, ge=0)
+    is_active: Optional[bool] = None
+
+    # пустое поле формы (price=, stock=, is_active=) — «не менять», как и null:
+    # None отбрасывает update_product. Валидаторы ProductIn с теми же именами
+    # подменяются, иначе "" превратился бы в 0 / false. Пустой title — по-прежнему
+    # 422 (min_length), как пустой name у CategoryPatch.
+    @field_validator("price", mode="before")
+    @classmethod
+    def _price(cls, v: Any):
+        return None if v is None or (isinstance(v, str) and not v.strip()) else to_float(v)
+
+    @field_validator("stock", mode="before")
+    @classmethod
+    def _stock(cls, v: Any):
+        return None if isinstance(v, str) and not v.strip() else v
+
+    @field_validator("is_active", mode="before")
+    @classmethod
+    def _active(cls, v: Any):
+        return None if v is None or (isinstance(v, str) and not v.strip()) else to_bool(v)
+
+    @field_validator("currency", mode="before")
+    @classmethod
+    def _curr(cls, v: Any) -> Optional[str]:
+        return v if isinstance(v, str) and v.strip() else None
 
 
 class ProductOut(BaseModel):
+    # хендлеры отдают ORM-объект как есть: поля копирует pydantic-core
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     title: str
     slug: str
@@ -271,36 +416,94 @@ class ProductOut(BaseModel):
     attributes: Optional[Union[Dict[str, Any], List[Any]]]
     category_id: int
 
+    @field_validator("price", mode="before")
+    @classmethod
+    def _price(cls, v: Any) -> float:
+        return float(v)  # Numeric → Decimal из БД
+
+    @field_validator("images", mode="before")
+    @classmethod
+    def _images(cls, v: Any):
+        return safe_images(v)
+
+    @field_validator("attributes", mode="before")
+    @classmethod
+    def _attrs(cls, v: Any):
+        return safe_attrs(v)
+
+
+# один на модуль: схема списка компилируется при импорте, а не на каждый ответ
+PRODUCT_LIST_ADAPTER = TypeAdapter(List[ProductOut])
+
+
+# Пакетные операции (импорт/чистка из админки)
+class ProductBulkIn(BaseModel):
+    items: List[ProductIn] = Field(..., min_length=1, max_length=1000)
+
+
+class ProductIdsIn(BaseModel):
+    ids: List[conint(gt=0)] = Field(..., min_length=1, max_length=1000)
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Users
 # ──────────────────────────────────────────────────────────────────────────────
 @router.post("/users/ensure", response_model=EnsureUserOut)
 async def ensure_user(payload: EnsureUserIn, session: AsyncSession = Depends(get_session)):
-    q = select(User).where(User.tg_id == payload.tg_id)
-    res = await session.execute(q)
-    user = res.scalar_one_or_none()
-    if not user:
-        user = User(tg_id=payload.tg_id, is_admin=(payload.tg_id in MODERATOR_IDS))
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-    return EnsureUserOut(
-        id=user.id,
-        tg_id=user.tg_id,
-        is_admin=bool(user.is_admin),
-        is_active=bool(user.is_active),
+    # один запрос вместо SELECT → INSERT → REFRESH; при гонке первого входа
+    # ON CONFLICT просто вернёт уже существующую строку
+    stmt = pg_insert(User).values(
+        tg_id=payload.tg_id, is_admin=(payload.tg_id in MODERATOR_IDS)
     )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.tg_id], set_={"tg_id": stmt.excluded.tg_id}
+    ).returning(User.id, User.tg_id, User.is_admin, User.is_active)
+    # только нужные колонки: без ORM-объекта в identity map и лишних created_at/updated_at
+    row = (await session.execute(stmt)).one()
+    await session.commit()
+    # mapping строки как есть: валидирует и сериализует его один раз response_model
+    return row._mapping
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Categories (проверка parent_id + дружелюбные ошибки)
 # ──────────────────────────────────────────────────────────────────────────────
-@router.get("/categories", response_model=List[CategoryOut])
+
+# поля категории, которые принимаем из JSON/формы (create/update)
+_CATEGORY_FIELDS = frozenset({"name", "slug", "parent_id"})
+
+# Category.children грузится selectin'ом (для дерева); плоским ответам
+# ниже дети не нужны — отключаем, чтобы не было лишних SELECT ... IN
+_FLAT_CATEGORY = raiseload(Category.children)
+
+# Категории меняются редко (только админ), а /categories дёргается при каждом
+# открытии WebApp — держим уже сериализованный ответ в памяти процесса.
+# Кэш сбрасывают create/update/delete, но только в своём процессе: остальные
+# воркеры gunicorn увидят правку, когда их копия устареет по TTL (не дольше 10 с).
+_CATEGORIES_TTL = 10.0
+_categories_cache: Optional[tuple[float, bytes]] = None  # (time.monotonic(), тело ответа)
+_categories_ver = 0  # растёт на каждой правке: чтение, начатое до неё, кэш не заполнит
+
+def _invalidate_categories() -> None:
+    global _categories_cache, _categories_ver
+    _categories_cache = None
+    _categories_ver += 1
+
+
+@router.get("/categories", response_model=None, responses={200: {"model": List[CategoryOut]}})
 async def list_categories(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(Category).order_by(Category.id))
-    rows = res.scalars().all()
-    return [CategoryOut(id=r.id, name=r.name, slug=r.slug, parent_id=r.parent_id) for r in rows]
+    global _categories_cache
+    now = time.monotonic()
+    cached = _categories_cache
+    if cached is not None and now - cached[0] < _CATEGORIES_TTL:
+        return Response(cached[1], media_type="application/json")
+    ver = _categories_ver
+    # колонки = CategoryOut; ключи маппинга совпадают с полями ответа
+    res = await session.execute(select(*_CATEGORY_COLUMNS).order_by(Category.id))
+    body = orjson.dumps([dict(m) for m in res.mappings()])
+    if ver == _categories_ver:
+        _categories_cache = (now, body)
+    return Response(body, media_type="application/json")
 
 
 @router.post("/categories", response_model=CategoryOut)
@@ -309,7 +512,7 @@ async def create_category(
     _: int = Depends(require_admin),
     session: AsyncSession = Depends(get_session),
 ):
-    raw = await parse_json_or_form(request, ["name", "slug", "parent_id"])
+    raw = await parse_json_or_form(request, _CATEGORY_FIELDS)
 
     name = (raw.get("name") or "").strip()
     slug = (raw.get("slug") or "").strip()
@@ -320,21 +523,26 @@ async def create_category(
     if not slug:
         raise HTTPException(422, detail="slug is required")
 
-    if parent_id is not None:
-        exists = await session.scalar(select(Category.id).where(Category.id == parent_id))
-        if not exists:
-            raise HTTPException(422, detail=f"parent_id={parent_id} does not exist")
-
-    cat = Category(name=name, slug=slug, parent_id=parent_id)
-    session.add(cat)
+    # INSERT ... RETURNING: строка целиком (id, server_default) за один запрос;
+    # несуществующего родителя ловит FK в том же запросе — без отдельного SELECT
+    stmt = (
+        insert(Category)
+        .values(name=name, slug=slug, parent_id=parent_id)
+        .returning(Category)
+        .options(_FLAT_CATEGORY)
+    )
     try:
+        cat = (await session.execute(stmt)).scalar_one()
         await session.commit()
     except IntegrityError as e:
         await session.rollback()
+        if "foreign key" in str(e).lower():
+            raise HTTPException(422, detail=f"parent_id={parent_id} does not exist") from e
         raise HTTPException(409, detail="category slug already exists") from e
+    _invalidate_categories()
 
-    await session.refresh(cat)
-    return CategoryOut(id=cat.id, name=cat.name, slug=cat.slug, parent_id=cat.parent_id)
+    # expire_on_commit=False: после commit объект из RETURNING читается без SELECT
+    return cat
 
 
 @router.patch("/categories/{category_id}", response_model=CategoryOut)
@@ -344,43 +552,41 @@ async def update_category(
     _: int = Depends(require_admin),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await session.execute(select(Category).where(Category.id == category_id))
-    cat = res.scalar_one_or_none()
+    values = (await parse_model_or_422(request, CategoryPatch, _CATEGORY_FIELDS)).model_dump(exclude_unset=True)
+
+    if "parent_id" in values and values["parent_id"] == category_id:
+        raise HTTPException(422, detail="parent_id cannot be equal to category_id")
+    if values.get("parent_id") is not None:
+        # цикл A→B→A: категория не может стать потомком собственного потомка
+        ancestors = category_ancestors_cte(values["parent_id"])
+        if await session.scalar(select(ancestors.c.id).where(ancestors.c.id == category_id)):
+            raise HTTPException(422, detail="parent_id cannot be a descendant of category_id")
+
+    if not values:
+        cat = await session.get(Category, category_id, options=[_FLAT_CATEGORY])
+    else:
+        # UPDATE ... RETURNING: один запрос вместо SELECT → flush → REFRESH
+        stmt = (
+            update(Category)
+            .where(Category.id == category_id)
+            .values(**values)
+            .returning(Category)
+            .options(_FLAT_CATEGORY)
+        )
+        try:
+            cat = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            # родителя проверяет FK в самом UPDATE
+            if "foreign key" in str(e).lower():
+                raise HTTPException(422, detail=f"parent_id={values.get('parent_id')} does not exist") from e
+            raise HTTPException(409, detail="category slug already exists") from e
+        _invalidate_categories()
+
     if not cat:
         raise HTTPException(404, "Категория не найдена")
-
-    raw = await parse_json_or_form(request, ["name", "slug", "parent_id"])
-
-    if "name" in raw:
-        name = (raw.get("name") or "").strip()
-        if not name:
-            raise HTTPException(422, detail="name is required")
-        cat.name = name
-
-    if "slug" in raw:
-        s = (raw.get("slug") or "").strip()
-        if not s:
-            raise HTTPException(422, detail="slug is required")
-        cat.slug = s
-
-    if "parent_id" in raw:
-        pid = to_int_or_none(raw.get("parent_id"))
-        if pid == category_id:
-            raise HTTPException(422, detail="parent_id cannot be equal to category_id")
-        if pid is not None:
-            exists = await session.scalar(select(Category.id).where(Category.id == pid))
-            if not exists:
-                raise HTTPException(422, detail=f"parent_id={pid} does not exist")
-        cat.parent_id = pid
-
-    try:
-        await session.commit()
-    except IntegrityError as e:
-        await session.rollback()
-        raise HTTPException(409, detail="category slug already exists") from e
-
-    await session.refresh(cat)
-    return CategoryOut(id=cat.id, name=cat.name, slug=cat.slug, parent_id=cat.parent_id)
+    return cat
 
 
 @router.delete("/categories/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -389,86 +595,257 @@ async def delete_category(
     _: int = Depends(require_admin),
     session: AsyncSession = Depends(get_session),
 ):
-    await session.execute(delete(Category).where(Category.id == category_id))
-    await session.commit()
+    # DELETE ... RETURNING id: удаление и проверка «было ли что удалять» одним запросом
+    stmt = (
+        delete(Category)
+        .where(Category.id == category_id)
+        .returning(Category.id)
+        .execution_options(synchronize_session=False)
+    )
+    async with session.begin():
+        deleted = (await session.execute(stmt)).scalar_one_or_none()
+    if deleted is None:
+        raise HTTPException(404, "Категория не найдена")
+    _invalidate_categories()
     return None
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Products (проверка category_id + дружелюбные ошибки)
 # ──────────────────────────────────────────────────────────────────────────────
-@router.get("/products", response_model=List[ProductOut])
+# поля товара, которые принимаем из JSON/формы (create/update)
+_PRODUCT_FIELDS = frozenset({
+    "title", "slug", "description", "price", "currency",
+    "stock", "is_active", "images", "attributes", "category_id",
+})
+
+
+def category_subtree_cte(root_id: int):
+    """
+    WITH RECURSIVE: id категории root_id и всех её потомков одним запросом
+    (вместо обхода дерева по уровням). UNION, а не UNION ALL: повторный id
+    отбрасывается, и рекурсия заканчивается даже на цикле в parent_id.
+    """
+    cte = (
+        select(Category.id)
+        .where(Category.id == root_id)
+        .cte("category_subtree", recursive=True)
+    )
+    return cte.union(
+        select(Category.id).join(cte, Category.parent_id == cte.c.id)
+    )
+
+
+def category_ancestors_cte(start_id: int):
+    """WITH RECURSIVE: категория start_id и все её предки вверх по parent_id."""
+    cte = (
+        select(Category.id, Category.parent_id)
+        .where(Category.id == start_id)
+        .cte("category_ancestors", recursive=True)
+    )
+    return cte.union(
+        select(Category.id, Category.parent_id).join(cte, Category.id == cte.c.parent_id)
+    )
+
+
+def _where_products(
+    stmt: Select,
+    q: Optional[str],
+    category_id: Optional[int],
+    min_price: Optional[Decimal],
+    max_price: Optional[Decimal],
+    is_active: Optional[bool],
+) -> Select:
+    """
+    Фильтры витрины — общие для списка и счётчика. Каждое условие — своим
+    .where() (SQLAlchemy склеит их через AND); без фильтров WHERE нет вовсе.
+    Цены приходят уже Decimal (FastAPI разбирает query сам) и идут в Numeric как есть.
+    """
+    if is_active is not None:
+        stmt = stmt.where(Product.is_active == is_active)
+    if category_id is not None:
+        # товары категории вместе с подкатегориями
+        subtree = category_subtree_cte(category_id)
+        stmt = stmt.where(Product.category_id.in_(select(subtree.c.id)))
+    if min_price is not None:
+        stmt = stmt.where(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Product.price <= max_price)
+    if q:
+        # слова (с морфологией) — по GIN ix_products_fts, подстрока названия
+        # — по триграммам; оба условия индексные, план — BitmapOr.
+        # Из 1–2 символов '%q%' не даёт ни одной триграммы (GIN читается целиком),
+        # поэтому короткий запрос ищем по началу названия ('q%' триграммы даёт).
+        # autoescape: % и _ из запроса — обычные символы, а не шаблон
+        if len(q) < 3:
+            title_cond = Product.title.istartswith(q, autoescape=True)
+        else:
+            title_cond = Product.title.icontains(q, autoescape=True)
+        stmt = stmt.where(or_(
+            Product.search_vector.op("@@")(func.websearch_to_tsquery("russian", q)),
+            title_cond,
+        ))
+    return stmt
+
+
+@router.get("/products", response_model=None, responses={200: {"model": List[ProductOut]}})
 async def list_products(
     q: Optional[str] = Query(None, description="Поиск по названию/описанию"),
-    category_id: Optional[int] = Query(None),
-    min_price: Optional[float] = Query(None, ge=0),
-    max_price: Optional[float] = Query(None, ge=0),
+    category_id: Optional[int] = Query(None, description="Категория вместе с подкатегориями"),
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
     is_active: Optional[bool] = Query(True),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    after_id: Optional[int] = Query(
+        None, ge=1, description="Keyset-курсор: id последнего товара прошлой страницы (X-Next-Cursor)"
+    ),
     session: AsyncSession = Depends(get_session),
 ):
-    conds = []
-    if is_active is not None:
-        conds.append(Product.is_active == is_active)
-    if category_id is not None:
-        conds.append(Product.category_id == category_id)
-    if min_price is not None:
-        conds.append(Product.price >= Decimal(str(min_price)))
-    if max_price is not None:
-        conds.append(Product.price <= Decimal(str(max_price)))
-    if q:
-        conds.append(or_(Product.title.ilike(f"%{q}%"), Product.description.ilike(f"%{q}%")))
+    if category_id is None:
+        stmt = _where_products(select(*_PRODUCT_COLUMNS), q, None, min_price, max_price, is_active)
+        if after_id is not None:
+            stmt = stmt.where(Product.id < after_id)
+        stmt = stmt.order_by(Product.id.desc()).limit(limit)
+    else:
+        # category_id IN (поддерево) планировщик ведёт обратным проходом по
+        # products_pkey с фильтром: для редкой категории это вся таблица.
+        # Вместо этого — LATERAL на каждую категорию поддерева: по limit строк
+        # из ix_products_active_cat_id (is_active, category_id = ?, id DESC),
+        # затем top-N сортировка не более чем len(поддерево) * limit строк.
+        subtree = category_subtree_cte(category_id)
+        per_cat = _where_products(select(*_PRODUCT_COLUMNS), q, None, min_price, max_price, is_active)
+        per_cat = per_cat.where(Product.category_id == subtree.c.id)
+        if after_id is not None:
+            per_cat = per_cat.where(Product.id < after_id)
+        per_cat = per_cat.order_by(Product.id.desc()).limit(limit).lateral("p")
+        stmt = (
+            select(per_cat)
+            .select_from(subtree)
+            .join(per_cat, true())
+            .order_by(per_cat.c.id.desc())
+            .limit(limit)
+        )
+    res = await session.execute(stmt)
+    rows = [_product_row(m) for m in res.mappings()]
+
+    # тело остаётся массивом (витрина ждёт список); курсор следующей
+    # страницы — в заголовке, только если страница заполнена целиком
+    headers = {"X-Next-Cursor": str(rows[-1]["id"])} if len(rows) == limit else None
+    return ORJSONResponse(rows, headers=headers)
+
+
+# Оценка числа товаров из статистики планировщика (обновляет ANALYZE/autovacuum):
+# без фильтров, кроме is_active, это O(1) вместо COUNT(*) по всей таблице —
+# reltuples × доля is_active = true/false из pg_stats. Держим 60 с в процессе.
+_COUNT_ESTIMATE_TTL = 60.0
+# (time.monotonic(), reltuples, {значение is_active: доля} или None — статистики нет)
+_count_estimate: Optional[tuple[float, int, Optional[dict[bool, float]]]] = None
+
+_COUNT_ESTIMATE_SQL = text(
+    "SELECT c.reltuples::bigint, s.most_common_vals::text, s.most_common_freqs "
+    "FROM pg_class c LEFT JOIN pg_stats s ON s.schemaname = current_schema() "
+    "AND s.tablename = 'products' AND s.attname = 'is_active' "
+    "WHERE c.oid = 'products'::regclass"
+)
 
-    stmt = (
-        select(Product)
-        .where(and_(*conds) if conds else True)
-        .order_by(Product.id.desc())
-        .limit(limit)
-        .offset(offset)
+
+@router.get(
+    "/products/count",
+    summary="Число товаров для пагинатора",
+    description=(
+        "exact=0 и без фильтров, кроме is_active, — приблизительно: pg_class.reltuples "
+        "× доля is_active из pg_stats (статистика ANALYZE, кэш 60 с). "
+        "С другими фильтрами или exact=1 — точный COUNT(*)."
+    ),
+)
+async def count_products(
+    q: Optional[str] = Query(None, description="Поиск по названию/описанию"),
+    category_id: Optional[int] = Query(None, description="Категория вместе с подкатегориями"),
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    # тот же фильтр по умолчанию, что у списка: счётчик пагинатора = то, что витрина покажет
+    is_active: Optional[bool] = Query(True),
+    exact: bool = Query(False, description="Точный COUNT(*) вместо оценки"),
+    session: AsyncSession = Depends(get_session),
+):
+    global _count_estimate
+    if not exact and q is None and category_id is None and min_price is None and max_price is None:
+        now = time.monotonic()
+        cached = _count_estimate
+        if not (cached and now - cached[0] < _COUNT_ESTIMATE_TTL):
+            rows, vals, freqs = (await session.execute(_COUNT_ESTIMATE_SQL)).one()
+            # most_common_vals для bool — '{t,f}'; значения нет в списке — его доля 0
+            shares = dict(zip((v == "t" for v in vals.strip("{}").split(",")), freqs)) if vals else None
+            cached = _count_estimate = (now, rows, shares)
+        rows, shares = cached[1], cached[2]
+        # -1: таблицу ещё ни разу не анализировали; нет pg_stats — считаем честно
+        if rows >= 0 and (is_active is None or shares is not None):
+            share = 1.0 if is_active is None else shares.get(is_active, 0.0)
+            return ORJSONResponse({"count": round(rows * share), "exact": False})
+
+    stmt = _where_products(
+        select(func.count()).select_from(Product), q, category_id, min_price, max_price, is_active
     )
-    res = await session.execute(stmt)
-    rows = res.scalars().all()
-
-    def _to_out(p: Product) -> ProductOut:
-        price = float(p.price) if isinstance(p.price, Decimal) else float(p.price or 0)
-        return ProductOut(
-            id=p.id,
-            title=p.title,
-            slug=p.slug,
-            description=p.description,
-            price=price,
-            currency=p.currency,
-            stock=p.stock,
-            is_active=bool(p.is_active),
-            images=safe_images(p.images),
-            attributes=safe_attrs(p.attributes),
-            category_id=p.category_id,
-        )
+    n = await session.scalar(stmt)
+    return ORJSONResponse({"count": n, "exact": True})
 
-    return [_to_out(p) for p in rows]
 
+@router.post("/products/bulk", response_model=List[ProductOut], status_code=201)
+async def create_products_bulk(
+    payload: ProductBulkIn,
+    _: int = Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    rows = []
+    for it in payload.items:
+        if it.category_id is None:
+            raise HTTPException(422, detail="category_id is required and must be int")
+        rows.append(it.model_dump() | {
+            "slug": it.slug or slugify(it.title),
+            "price": Decimal(str(it.price)),
+        })
+
+    # один INSERT ... VALUES (...), (...) RETURNING (insertmanyvalues) и одна
+    # транзакция на весь импорт вместо N запросов; порядок ответа = порядок items
+    stmt = insert(Product).returning(Product, sort_by_parameter_order=True)
+    try:
+        products = (await session.scalars(stmt, rows)).all()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        msg = str(e).lower()
+        if "unique" in msg and "slug" in msg:
+            raise HTTPException(409, detail="product slug already exists") from e
+        if "foreign key" in msg:
+            raise HTTPException(422, detail="invalid category_id (foreign key)") from e
+        raise HTTPException(400, detail="cannot create products") from e
+
+    # ORM-объекты → list[ProductOut] → JSON: оба шага одним адаптером в pydantic-core
+    body = PRODUCT_LIST_ADAPTER.dump_json(
+        PRODUCT_LIST_ADAPTER.validate_python(products, from_attributes=True)
+    )
+    return Response(body, status_code=201, media_type="application/json")
+
+
+@router.delete("/products/bulk", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_products_bulk(
+    payload: ProductIdsIn,
+    _: int = Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    await session.execute(delete(Product).where(Product.id.in_(payload.ids)))
+    await session.commit()
+    return None
 
-@router.get("/products/{product_id}", response_model=ProductOut)
+
+@router.get("/products/{product_id}", response_model=None, responses={200: {"model": ProductOut}})
 async def get_product(product_id: int, session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(Product).where(Product.id == product_id))
-    p = res.scalar_one_or_none()
-    if not p:
+    # те же колонки, что у списка: строка сразу в orjson, без ORM-объекта
+    res = await session.execute(select(*_PRODUCT_COLUMNS).where(Product.id == product_id))
+    row = res.mappings().first()
+    if row is None:
         raise HTTPException(404, "Товар не найден")
-    price = float(p.price) if isinstance(p.price, Decimal) else float(p.price or 0)
-    return ProductOut(
-        id=p.id,
-        title=p.title,
-        slug=p.slug,
-        description=p.description,
-        price=price,
-        currency=p.currency,
-        stock=p.stock,
-        is_active=bool(p.is_active),
-        images=safe_images(p.images),
-        attributes=safe_attrs(p.attributes),
-        category_id=p.category_id,
-    )
+    return ORJSONResponse(_product_row(row))
 
 
 @router.post("/products", response_model=ProductOut, status_code=201)
@@ -477,76 +854,30 @@ async def create_product(
     _: int = Depends(require_admin),
     session: AsyncSession = Depends(get_session),
 ):
-    allowed = [
-        "title", "slug", "description", "price", "currency",
-        "stock", "is_active", "images", "attributes", "category_id",
-    ]
-    raw = await parse_json_or_form(request, allowed)
-
-    title = str(raw.get("title", "")).strip()
-    if not title:
-        raise HTTPException(422, detail="title is required")
-
-    slug = (str(raw.get("slug") or "").strip()) or slugify(title)
-    description = (str(raw.get("description") or "").strip()) or None
-    price = to_float(raw.get("price", 0))
-    currency = (str(raw.get("currency", "RUB")).strip().upper()) or "RUB"
-    stock = int(to_int_or_none(raw.get("stock")) or 0)
-    is_active = to_bool(raw.get("is_active"))
-
-    images = raw.get("images")
-    if isinstance(images, str):
-        images = parse_json_field(images)
-    attributes = raw.get("attributes")
-    if isinstance(attributes, str):
-        attributes = parse_json_field(attributes)
-
-    category_id = to_int_or_none(raw.get("category_id"))
-    if category_id is None:
-        raise HTTPException(422, detail="category_id is required and must be int")
-    exists = await session.scalar(select(Category.id).where(Category.id == category_id))
-    if not exists:
-        raise HTTPException(422, detail=f"category_id={category_id} does not exist")
-
-    p = Product(
-        title=title,
-        slug=slug,
-        description=description,
-        price=Decimal(str(price)),
-        currency=currency,
-        stock=stock,
-        is_active=is_active,
-        images=images,
-        attributes=attributes,
-        category_id=category_id,
-    )
+    # вся нормализация (строки формы, JSON-строки images/attributes) — в валидаторах схемы
+    payload = await parse_model_or_422(request, ProductIn, _PRODUCT_FIELDS)
 
-    session.add(p)
+    if payload.category_id is None:
+        raise HTTPException(422, detail="category_id is required and must be int")
+    # INSERT ... RETURNING: строка целиком (id, server_default) за один запрос
+    stmt = insert(Product).values(**(payload.model_dump() | {
+        "slug": payload.slug or slugify(payload.title),
+        "price": Decimal(str(payload.price)),
+    })).returning(Product)
     try:
-        await session.commit()
+        # категорию проверяет FK в самом INSERT; commit/rollback делает begin()
+        async with session.begin():
+            p = (await session.execute(stmt)).scalar_one()
     except IntegrityError as e:
-        await session.rollback()
         msg = str(e).lower()
         if "unique" in msg and "slug" in msg:
             raise HTTPException(409, detail="product slug already exists") from e
         if "foreign key" in msg:
-            raise HTTPException(422, detail="invalid category_id (foreign key)") from e
+            raise HTTPException(422, detail=f"category_id={payload.category_id} does not exist") from e
         raise HTTPException(400, detail="cannot create product") from e
 
-    await session.refresh(p)
-    return ProductOut(
-        id=p.id,
-        title=p.title,
-        slug=p.slug,
-        description=p.description,
-        price=float(p.price),
-        currency=p.currency,
-        stock=p.stock,
-        is_active=bool(p.is_active),
-        images=safe_images(p.images),
-        attributes=safe_attrs(p.attributes),
-        category_id=p.category_id,
-    )
+    # expire_on_commit=False: после commit объект из RETURNING читается без SELECT
+    return p
 
 
 @router.patch("/products/{product_id}", response_model=ProductOut)
@@ -556,75 +887,53 @@ async def update_product(
     _: int = Depends(require_admin),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await session.execute(select(Product).where(Product.id == product_id))
-    p = res.scalar_one_or_none()
+    # только присланные поля: UPDATE трогает лишь изменённые колонки
+    payload = await parse_model_or_422(request, ProductPatch, _PRODUCT_FIELDS)
+    values = payload.model_dump(exclude_unset=True)
+
+    # NOT NULL-колонки: null в JSON / пустое поле формы (ProductPatch даёт None) = «не менять»
+    for k in ("title", "price", "currency", "stock", "is_active"):
+        if k in values and values[k] is None:
+            del values[k]
+    if "price" in values:
+        values["price"] = Decimal(str(values["price"]))
+    if "slug" in values and values["slug"] is None:
+        # пустой slug → из названия (нового или текущего)
+        title = values.get("title") or await session.scalar(
+            select(Product.title).where(Product.id == product_id)
+        )
+        if title is None:
+            raise HTTPException(404, "Товар не найден")
+        values["slug"] = slugify(title)
+    if "category_id" in values and values["category_id"] is None:
+        raise HTTPException(422, detail="category_id must be int")
+
+    if not values:
+        p = await session.get(Product, product_id)
+    else:
+        # UPDATE ... RETURNING: один запрос вместо SELECT → flush → REFRESH
+        stmt = (
+            update(Product)
+            .where(Product.id == product_id)
+            .values(**values)
+            .returning(Product)
+        )
+        try:
+            p = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            msg = str(e).lower()
+            if "unique" in msg and "slug" in msg:
+                raise HTTPException(409, detail="product slug already exists") from e
+            if "foreign key" in msg:
+                # категорию проверяет FK в самом UPDATE
+                raise HTTPException(422, detail=f"category_id={values['category_id']} does not exist") from e
+            raise HTTPException(400, detail="cannot update product") from e
+
     if not p:
         raise HTTPException(404, "Товар не найден")
-
-    allowed = [
-        "title", "slug", "description", "price", "currency",
-        "stock", "is_active", "images", "attributes", "category_id",
-    ]
-    raw = await parse_json_or_form(request, allowed)
-
-    if "title" in raw:
-        t = str(raw["title"]).strip()
-        if not t:
-            raise HTTPException(422, detail="title is required")
-        p.title = t
-    if "slug" in raw:
-        s = str(raw["slug"]).strip()
-        p.slug = s or slugify(p.title)
-    if "description" in raw:
-        d = str(raw["description"]).strip()
-        p.description = d or None
-    if "price" in raw:
-        p.price = Decimal(str(to_float(raw["price"])))
-    if "currency" in raw:
-        p.currency = (str(raw["currency"]).strip().upper()) or p.currency
-    if "stock" in raw:
-        iv = to_int_or_none(raw["stock"])
-        p.stock = int(iv or 0)
-    if "is_active" in raw:
-        p.is_active = to_bool(raw["is_active"])
-    if "images" in raw:
-        p.images = parse_json_field(raw["images"]) if isinstance(raw["images"], str) else raw["images"]
-    if "attributes" in raw:
-        p.attributes = parse_json_field(raw["attributes"]) if isinstance(raw["attributes"], str) else raw["attributes"]
-    if "category_id" in raw:
-        cid = to_int_or_none(raw["category_id"])
-        if cid is None:
-            raise HTTPException(422, detail="category_id must be int")
-        exists = await session.scalar(select(Category.id).where(Category.id == cid))
-        if not exists:
-            raise HTTPException(422, detail=f"category_id={cid} does not exist")
-        p.category_id = cid
-
-    try:
-        await session.commit()
-    except IntegrityError as e:
-        await session.rollback()
-        msg = str(e).lower()
-        if "unique" in msg and "slug" in msg:
-            raise HTTPException(409, detail="product slug already exists") from e
-        if "foreign key" in msg:
-            raise HTTPException(422, detail="invalid category_id (foreign key)") from e
-        raise HTTPException(400, detail="cannot update product") from e
-
-    await session.refresh(p)
-    return ProductOut(
-        id=p.id,
-        title=p.title,
-        slug=p.slug,
-        description=p.description,
-        price=float(p.price),
-        currency=p.currency,
-        stock=p.stock,
-        is_active=bool(p.is_active),
-        images=safe_images(p.images),
-        attributes=safe_attrs(p.attributes),
-        category_id=p.category_id,
-    )
+    return p
 
 
 @router.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -633,6 +942,15 @@ async def delete_product(
     _: int = Depends(require_admin),
     session: AsyncSession = Depends(get_session),
 ):
-    await session.execute(delete(Product).where(Product.id == product_id))
-    await session.commit()
+    # DELETE ... RETURNING id: удаление и проверка «было ли что удалять» одним запросом
+    stmt = (
+        delete(Product)
+        .where(Product.id == product_id)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    )
+    async with session.begin():
+        deleted = (await session.execute(stmt)).scalar_one_or_none()
+    if deleted is None:
+        raise HTTPException(404, "Товар не найден")
     return None
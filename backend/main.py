@@ -1,10 +1,18 @@
 # backend/main.py
 from __future__ import annotations
 
+import asyncio
+import gzip
+import logging
 import os
 import ssl
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
 
+import orjson
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, FileResponse, Response
@@ -12,55 +20,100 @@ from fastapi.staticfiles import StaticFiles
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
 
 # ────────────────────────────────────────────────────────────────────────────────
 # App
 # ────────────────────────────────────────────────────────────────────────────────
-app = FastAPI(title="TG WebApp Backend", version="1.2.0")
+log = logging.getLogger("tg_shop.backend")
+
+
+async def _warm_pool(n: int) -> None:
+    # n соединений параллельно: TCP+TLS+auth проходят до первого запроса, а не в нём
+    async def _one() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*(_one() for _ in range(n)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # engine создаётся ниже при импорте модуля; lifespan запускается уже после
+    # NullPool (PgBouncer) соединений не держит — греть нечего
+    if engine is not None and not isinstance(engine.pool, NullPool):
+        n = min(int(os.getenv("DB_POOL_WARM", "1")), engine.pool.size())
+        if n > 0:
+            try:
+                await _warm_pool(n)
+            except Exception as e:  # БД недоступна при старте — не повод не подниматься
+                log.warning("DB pool warm-up failed: %s", e)
+    yield
+    if engine is not None:
+        # закрыть соединения пула при остановке/перезапуске воркера
+        await engine.dispose()
+
+
+app = FastAPI(title="TG WebApp Backend", version="1.2.0", lifespan=lifespan)
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Static (favicon, assets)
 # ────────────────────────────────────────────────────────────────────────────────
-BASE_DIR = Path(__file__).resolve().parent
+# __file__ у импортированного модуля уже абсолютный; resolve() (realpath) не нужен —
+# симлинков, от которых зависела бы логика, тут нет
+BASE_DIR = Path(__file__).parent
 STATIC_DIR = BASE_DIR / "static"
-STATIC_DIR.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+if not STATIC_DIR.is_dir():  # обычно папка уже есть — обходимся одним stat
+    STATIC_DIR.mkdir(exist_ok=True)
+
+
+class CachedStatic(StaticFiles):
+    """
+    StaticFiles + Cache-Control. Имена файлов без хэша версии, поэтому не
+    immutable на год, а сутки: дальше браузер перепроверит по ETag и получит 304.
+    """
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = "public, max-age=86400"
+        return response
+
+
+app.mount("/static", CachedStatic(directory=STATIC_DIR), name="static")
 
 # ────────────────────────────────────────────────────────────────────────────────
 # CORS — максимально жёсткая защита от приколов
 # ────────────────────────────────────────────────────────────────────────────────
 
-# 1) Стандартный CORSMiddleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],      # любой origin
-    allow_credentials=False,  # куки не используем
-    allow_methods=["*"],      # GET, POST, PATCH, DELETE, OPTIONS и т.д.
-    allow_headers=["*"],      # любые заголовки, включая X-Telegram-Id
+# ALLOWED_ORIGINS="https://a.example,https://b.example" — точный список (проверка
+# Origin — поиск в множестве, без регэкспов). ALLOWED_ORIGIN_REGEX — шаблон для
+# семейства доменов (Starlette компилирует его один раз и сверяет fullmatch,
+# т.е. якоря не нужны); избегать «.*». Не задано ни то, ни другое — любой origin.
+ALLOWED_ORIGINS: frozenset[str] = frozenset(
+    o.rstrip("/") for o in map(str.strip, os.getenv("ALLOWED_ORIGINS", "").split(",")) if o
 )
 
-# 2) Дополнительный http-middleware, который в ЛЮБОЙ ответ добавит CORS-заголовки
-@app.middleware("http")
-async def add_cors_headers(request: Request, call_next):
-    response: Response = await call_next(request)
-    # Если по какой-то причине CORSMiddleware не сработал, подстрахуемся
-    if "access-control-allow-origin" not in (k.lower() for k in response.headers.keys()):
-      response.headers["Access-Control-Allow-Origin"] = "*"
-      response.headers["Access-Control-Allow-Headers"] = "*"
-      response.headers["Access-Control-Allow-Methods"] = "*"
-    return response
-
-# 3) Явный обработчик preflight для всех /api/* (OPTIONS)
-@app.options("/api/{path:path}")
-async def options_cors_preflight(path: str) -> Response:
-    return Response(
-        status_code=204,
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "*",
-        },
-    )
+
+def _build_cors_cfg() -> dict:
+    """Настройки CORSMiddleware из env — считаются один раз при импорте."""
+    cfg: dict = {
+        "allow_credentials": False,  # куки не используем
+        "allow_methods": ["*"],      # GET, POST, PATCH, DELETE, OPTIONS и т.д.
+        "allow_headers": ["*"],      # любые заголовки, включая X-Telegram-Id
+        "expose_headers": ["X-Next-Cursor"],  # иначе браузер не даст фронту прочитать курсор /api/products
+    }
+    regex = os.getenv("ALLOWED_ORIGIN_REGEX", "").strip()
+    if "*" in ALLOWED_ORIGINS or not (ALLOWED_ORIGINS or regex):
+        cfg["allow_origins"] = ["*"]
+    else:
+        cfg["allow_origins"] = ALLOWED_ORIGINS
+        if regex:
+            cfg["allow_origin_regex"] = regex
+    return cfg
+
+
+# CORSMiddleware сам отвечает на preflight (OPTIONS) и ставит заголовки на все
+# ответы — отдельный http-middleware и OPTIONS-роут поверх него не нужны
+app.add_middleware(CORSMiddleware, **_build_cors_cfg())
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Database (asyncpg + TLS)
@@ -72,19 +125,83 @@ DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
 engine = None
 SessionLocal: async_sessionmaker[AsyncSession] | None = None
 
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+# USE_PGBOUNCER=1: перед Postgres стоит PgBouncer (transaction pooling) —
+# соединения мультиплексирует он, свой пул в каждом воркере не нужен
+USE_PGBOUNCER = _env_flag("USE_PGBOUNCER")
+
+
+@lru_cache(maxsize=1)
+def _ssl_ctx() -> ssl.SSLContext:
+    # CA-бандл системы читается один раз на процесс; контекст общий для всех соединений пула
+    return ssl.create_default_context()
+
+
 if DATABASE_URL:
     # Для asyncpg нужен объект ssl, а не sslmode в URL
     connect_args: dict = {}
 
     if DATABASE_URL.startswith("postgresql+asyncpg://"):
-        connect_args["ssl"] = ssl.create_default_context()
+        connect_args["ssl"] = _ssl_ctx()
+        # кэш подготовленных выражений на соединение: после прогрева запросы
+        # эндпоинтов идут без повторного PARSE/планирования (asyncpg + SQLAlchemy)
+        connect_args["statement_cache_size"] = 1024
+        connect_args["prepared_statement_cache_size"] = 1024
+        if USE_PGBOUNCER:
+            # в transaction-режиме следующий запрос может уйти в другое серверное
+            # соединение: подготовленные выражения не кэшируем, имена — уникальные
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+        # запросы короткие (OLTP): JIT-компиляция плана стоит дороже, чем экономит
+        connect_args["server_settings"] = {
+            "jit": "off",
+            # keepalive со стороны сервера: полуоткрытое соединение (NAT/прокси
+            # забыл о нём) обнаружится за ~1 мин, а не через часы
+            "tcp_keepalives_idle": "30",
+            "tcp_keepalives_interval": "10",
+            "tcp_keepalives_count": "3",
+        }
+        if USE_PGBOUNCER:
+            # PgBouncer по умолчанию рвёт соединение на незнакомых параметрах
+            # стартового пакета ("unsupported startup parameter"), а SET в
+            # transaction-режиме не переживает транзакцию — не шлём ничего.
+            # jit/keepalive в этом режиме задаются на стороне БД:
+            # ALTER ROLE <user> SET jit = off (и т.п.)
+            del connect_args["server_settings"]
 
+    # Один пул на процесс: запросы переиспользуют тёплые TCP+TLS соединения.
+    # NullPool — в alembic/env.py (миграции) и за PgBouncer (USE_PGBOUNCER).
+    if USE_PGBOUNCER:
+        pool_kwargs: dict = {"poolclass": NullPool}
+    else:
+        # размеры пула — на процесс (воркер gunicorn): суммарно соединений до
+        # workers × (pool_size + max_overflow). DB_MAX_CONNS — бюджет соединений на
+        # всё приложение, держать ниже max_connections сервера. По умолчанию 80:
+        # у Postgres max_connections=100, из них 3 — superuser_reserved_connections,
+        # остальное — запас на alembic, psql и бота. Делим бюджет между воркерами без overflow. Число воркеров — тем же выражением,
+        # что в gunicorn.conf.py (пустое значение = не задано). Явные
+        # DB_POOL_SIZE/DB_MAX_OVERFLOW важнее
+        workers = int(os.getenv("WEB_CONCURRENCY") or min((os.cpu_count() or 1) * 2 + 1, 4))
+        per_worker = max(2, int(os.getenv("DB_MAX_CONNS") or 80) // workers)
+        pool_kwargs = {
+            "pool_size": int(os.getenv("DB_POOL_SIZE") or per_worker),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW") or 0),
+            # рвём соединения старше 30 мин до того, как их закроет сервер/прокси
+            "pool_recycle": int(os.getenv("DB_POOL_RECYCLE") or 1800),
+        }
+    # pre-ping — лишний SELECT 1 на каждую выдачу соединения из пула; по умолчанию
+    # выключен. Мёртвое соединение (рестарт БД) SQLAlchemy распознаёт сама: падает
+    # один запрос, а пул сбрасывает все соединения старше него. Включать (=1), если
+    # между приложением и БД есть прокси, молча рвущий простаивающие соединения.
     engine = create_async_engine(
         DATABASE_URL,
         connect_args=connect_args or None,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=0,
+        pool_pre_ping=_env_flag("DB_POOL_PRE_PING"),
+        **pool_kwargs,
     )
     SessionLocal = async_sessionmaker(
         bind=engine,
@@ -95,19 +212,49 @@ if DATABASE_URL:
     # кладём фабрику сессий в state — backend/api.py её подхватит
     app.state.sessionmaker = SessionLocal
 
+
+# Одна AsyncSession на запрос к /api: открываем здесь, а не генератором-зависимостью;
+# backend/api.py берёт её из request.state. Соединение из пула сессия берёт
+# только при первом запросе к БД и возвращает при закрытии после ответа.
+# Чистый ASGI, а не @app.middleware("http") (BaseHTTPMiddleware): без лишней
+# задачи и перекачки тела ответа; /health, /static и прочее проходят насквозь.
+class DBSessionPerRequest:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            SessionLocal is None
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or not scope["path"].startswith("/api/")
+        ):
+            return await self.app(scope, receive, send)
+        async with SessionLocal() as session:
+            # request.state — обёртка над scope["state"]
+            scope.setdefault("state", {})["session"] = session
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(DBSessionPerRequest)
+
 # ────────────────────────────────────────────────────────────────────────────────
 # API router
 # ────────────────────────────────────────────────────────────────────────────────
 from backend import api as api_module  # noqa: E402
+from backend.api import ORJSONResponse  # noqa: E402
 
 app.include_router(api_module.router, prefix="/api")
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Routes
 # ────────────────────────────────────────────────────────────────────────────────
-@app.get("/", response_class=HTMLResponse)
-async def root() -> str:
-    return """
+# Статичные ответы собираем один раз при импорте: страница — готовые байты,
+# про favicon знаем заранее, есть ли он (и его stat — FileResponse не зовёт os.stat).
+# Новый favicon.ico подхватится после рестарта.
+_PUBLIC_CACHE = {"Cache-Control": "public, max-age=86400"}
+
+_ROOT_HTML = """
     <!doctype html>
     <html lang="ru">
     <head><meta charset="utf-8"><title>TG WebApp Backend</title></head>
@@ -121,31 +268,102 @@ async def root() -> str:
       </ul>
     </body>
     </html>
-    """
+    """.encode("utf-8")
+# сжатая копия — один раз при импорте (stdlib gzip, без зависимости на brotli)
+_ROOT_HTML_GZ = gzip.compress(_ROOT_HTML, compresslevel=9, mtime=0)
+
 
+def _accepts_gzip(accept_encoding: str) -> bool:
+    # Accept-Encoding по RFC 9110: список "coding;q=..."; q=0 — явный отказ,
+    # "*" покрывает gzip, если он не назван отдельно ("identity;q=1, *;q=0" — нет)
+    q_gzip = q_any = None
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "x-gzip", "*"):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "*":
+            q_any = q
+        else:
+            q_gzip = q if q_gzip is None else max(q_gzip, q)
+    q = q_gzip if q_gzip is not None else q_any
+    return bool(q and q > 0)
 
-@app.get("/health")
-async def health() -> dict:
+_FAVICON_PATH = STATIC_DIR / "favicon.ico"
+_FAVICON_STAT = _FAVICON_PATH.stat() if _FAVICON_PATH.is_file() else None
+
+
+@app.get("/", response_class=HTMLResponse)
+async def root(request: Request) -> Response:
+    # Vary в обоих вариантах: кэш не должен отдать gzip клиенту без gzip и наоборот
+    headers = {**_PUBLIC_CACHE, "Vary": "Accept-Encoding"}
+    if _accepts_gzip(request.headers.get("accept-encoding", "")):
+        return HTMLResponse(_ROOT_HTML_GZ, headers={**headers, "Content-Encoding": "gzip"})
+    return HTMLResponse(_ROOT_HTML, headers=headers)
+
+
+# health-пробы дёргаются балансировщиком часто: ответ сразу через orjson,
+# без response_model (его FastAPI вывел бы из аннотации -> dict) и jsonable_encoder.
+# Тело /health не меняется — сериализуем его один раз
+_HEALTH_BYTES = orjson.dumps({"status": "ok", "database": "ok"})
+
+
+@app.get("/health", response_model=None)
+async def health() -> Response:
     # совместимость со старым фронтом
-    return {"status": "ok", "database": "ok"}
+    return Response(_HEALTH_BYTES, media_type="application/json")
 
 
-@app.get("/health/db")
-async def health_db() -> dict:
-    if engine is None:
-        return {"db": "skipped", "detail": "DATABASE_URL is not set"}
-    try:
-        async with engine.connect() as conn:
+# Результат проверки БД держим 5 с: частые пробы балансировщика не занимают
+# соединение пула каждую секунду. Зависшая БД не держит пробу дольше 2 с.
+_DB_HEALTH_TTL = 5.0
+_DB_HEALTH_TIMEOUT = 2.0
+_db_health: tuple[float, dict] | None = None  # (time.monotonic(), тело ответа)
+_NO_STORE = {"Cache-Control": "no-store"}
+
+
+async def _ping_db() -> None:
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        if hasattr(driver, "fetchval"):
+            # asyncpg напрямую: без компиляции SQL и объекта Result
+            await driver.fetchval("SELECT 1")
+        else:
             r = await conn.execute(text("SELECT 1"))
             _ = r.scalar_one()
-        return {"db": "ok"}
-    except Exception as e:
-        return {"db": "error", "detail": str(e)}
+
+
+@app.get("/health/db", response_model=None)
+async def health_db() -> Response:
+    global _db_health
+    if engine is None:
+        return ORJSONResponse({"db": "skipped", "detail": "DATABASE_URL is not set"}, headers=_NO_STORE)
+    now = time.monotonic()
+    if _db_health is None or now - _db_health[0] >= _DB_HEALTH_TTL:
+        try:
+            await asyncio.wait_for(_ping_db(), timeout=_DB_HEALTH_TIMEOUT)
+            body = {"db": "ok"}
+        except asyncio.TimeoutError:
+            body = {"db": "error", "detail": f"timeout after {_DB_HEALTH_TIMEOUT:g}s"}
+        except Exception as e:
+            body = {"db": "error", "detail": str(e)}
+        _db_health = (now, body)
+    return ORJSONResponse(_db_health[1], headers=_NO_STORE)
 
 
 @app.get("/favicon.ico")
 async def favicon() -> Response:
-    ico = STATIC_DIR / "favicon.ico"
-    if ico.exists():
-        return FileResponse(ico, media_type="image/x-icon")
-    return Response(status_code=204)
+    if _FAVICON_STAT is not None:
+        return FileResponse(
+            _FAVICON_PATH, media_type="image/x-icon", stat_result=_FAVICON_STAT, headers=_PUBLIC_CACHE
+        )
+    return Response(status_code=204, headers=_PUBLIC_CACHE)
@@ -5,7 +5,9 @@ from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
+    Computed,
     DateTime,
     ForeignKey,
     Integer,
@@ -14,10 +16,10 @@ from sqlalchemy import (
     Text,
     func,
     text,
-    JSON,
     Index,
     UniqueConstraint,
 )
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -35,7 +37,8 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    tg_id: Mapped[int] = mapped_column(Integer, unique=True, index=True, nullable=False)
+    # Telegram ID давно вышли за int32 — только BIGINT
+    tg_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True, nullable=False)
 
     # базовые флаги
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("true"))
@@ -74,7 +77,11 @@ class Category(Base):
         back_populates="children", remote_side="Category.id"
     )
     children: Mapped[List["Category"]] = relationship(
-        back_populates="parent", cascade="all, delete-orphan"
+        back_populates="parent", cascade="all, delete-orphan",
+        # дети подгружаются одним SELECT ... WHERE parent_id IN (...) на уровень,
+        # а не запросом на каждый узел (в async ленивой загрузки всё равно нет)
+        lazy="selectin",
+        join_depth=3,
     )
 
     # системные метки времени
@@ -100,7 +107,31 @@ class Product(Base):
     __table_args__ = (
         UniqueConstraint("slug", name="uq_products_slug"),
         Index("ix_products_category", "category_id"),
-        Index("ix_products_active", "is_active"),
+        # витрина по умолчанию: WHERE is_active ORDER BY id DESC LIMIT n —
+        # фильтр и порядок из одного индекса, поля карточки в INCLUDE
+        Index(
+            "ix_products_active_id_desc", "is_active", text("id DESC"),
+            postgresql_include=["title", "slug", "price", "currency", "stock", "category_id"],
+            postgresql_where=text("is_active"),
+        ),
+        # витрина категории: list_products делает LATERAL на каждую категорию
+        # поддерева — WHERE is_active AND category_id = ? ORDER BY id DESC LIMIT n,
+        # n строк из индекса без сортировки; общий top-N — по их объединению
+        Index("ix_products_active_cat_id", "is_active", "category_id", text("id DESC")),
+        # диапазон цены (min_price/max_price) без фильтра по категории
+        Index("ix_products_price", "price"),
+        # триграммы (pg_trgm) для подстрочного поиска ILIKE '%q%' по названию
+        Index(
+            "ix_products_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        # полнотекстовый поиск по названию+описанию: search_vector @@ tsquery
+        Index("ix_products_fts", "search_vector", postgresql_using="gin"),
+        # фильтры по атрибутам: attributes @> '{"brand": "..."}'
+        Index(
+            "ix_products_attrs_gin", "attributes",
+            postgresql_using="gin", postgresql_ops={"attributes": "jsonb_path_ops"},
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -116,9 +147,22 @@ class Product(Base):
     stock: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("true"))
 
-    # изображения (массив URL-ов) и произвольные атрибуты для фильтров
-    images: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)         # ["https://...jpg", ...]
-    attributes: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)     # {"brand":"...", "size":"M", ...}
+    # изображения (массив URL-ов) и произвольные атрибуты для фильтров;
+    # jsonb: хранится уже разобранным и индексируется GIN (attributes @> {...})
+    images: Mapped[Optional[list]] = mapped_column(JSONB(none_as_null=True), nullable=True)      # ["https://...jpg", ...]
+    attributes: Mapped[Optional[dict]] = mapped_column(JSONB(none_as_null=True), nullable=True)  # {"brand":"...", "size":"M", ...}
+
+    # tsvector для поиска (морфология русского); считает сам Postgres.
+    # deferred: в карточку не нужен, RETURNING/SELECT Product его не тянут
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('russian', coalesce(title, '') || ' ' || coalesce(description, ''))",
+            persisted=True,
+        ),
+        nullable=True,
+        deferred=True,
+    )
 
     # связь с категорией
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False)
@@ -152,4 +196,6 @@ async def init_db(engine) -> None:
         raise TypeError("init_db ожидает AsyncEngine")
 
     async with engine.begin() as conn:
+        # без расширения не создадутся GIN-индексы с gin_trgm_ops
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
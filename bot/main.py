@@ -1,9 +1,9 @@
 # bot/main.py
 from __future__ import annotations
 
+import asyncio
 import os
 import logging
-from urllib.parse import urlencode
 from dotenv import load_dotenv
 
 from telegram import (
@@ -36,50 +36,58 @@ logging.basicConfig(
 log = logging.getLogger("tg_shop.bot")
 
 
-def build_webapp_url() -> str:
-    # WEBAPP_URL уже может содержать ?api=... — просто возвращаем как есть
-    return WEBAPP_URL
+# Клавиатуры собираем один раз: WEBAPP_URL (уже может содержать ?api=...)
+# фиксирован на старте, а объекты telegram неизменяемы — их можно переиспользовать
+_WEBAPP = WebAppInfo(url=WEBAPP_URL)
 
+# Нижняя большая кнопка (Reply Keyboard)
+REPLY_KB = ReplyKeyboardMarkup(
+    [[KeyboardButton(text="🛍 Открыть магазин", web_app=_WEBAPP)]],
+    resize_keyboard=True,
+    one_time_keyboard=False,
+)
 
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    url = build_webapp_url()
+# Инлайн-кнопка над сообщением (дублируем)
+INLINE_KB = InlineKeyboardMarkup.from_button(
+    InlineKeyboardButton(text="Открыть магазин", web_app=_WEBAPP)
+)
 
-    # Нижняя большая кнопка (Reply Keyboard)
-    reply_kb = ReplyKeyboardMarkup(
-        [[KeyboardButton(text="🛍 Открыть магазин", web_app=WebAppInfo(url=url))]],
-        resize_keyboard=True,
-        one_time_keyboard=False,
-    )
-
-    # Инлайн-кнопка над сообщением (дублируем)
-    inline_kb = InlineKeyboardMarkup.from_button(
-        InlineKeyboardButton(text="Открыть магазин", web_app=WebAppInfo(url=url))
-    )
 
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     text = (
         "Привет! Это WebApp-магазин.\n\n"
         "Нажми кнопку ниже, чтобы открыть приложение.\n"
         "Если кнопка не появилась, обнови Telegram до последней версии."
     )
-    await update.message.reply_text(text, reply_markup=reply_kb)
-    await update.message.reply_text("Или нажми здесь:", reply_markup=inline_kb)
+    await update.message.reply_text(text, reply_markup=REPLY_KB)
+    await update.message.reply_text("Или нажми здесь:", reply_markup=INLINE_KB)
 
 
 async def open_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Альтернативная команда /open — сразу присылает инлайн-кнопку."""
-    url = build_webapp_url()
-    inline_kb = InlineKeyboardMarkup.from_button(
-        InlineKeyboardButton(text="Открыть магазин", web_app=WebAppInfo(url=url))
-    )
-    await update.message.reply_text("Открыть магазин:", reply_markup=inline_kb)
+    await update.message.reply_text("Открыть магазин:", reply_markup=INLINE_KB)
 
 
 def main() -> None:
-    app = Application.builder().token(BOT_TOKEN).build()
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("open", open_cmd))
+    # uvloop (libuv) вместо стандартного цикла asyncio; на Windows его нет —
+    # там остаёмся на обычном. Через политику: uvloop.install() в новых версиях устарел
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
+    app = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .build()
+    )
+    app.add_handlers([
+        CommandHandler("start", start),
+        CommandHandler("open", open_cmd),
+    ])
     log.info("🤖 Bot started")
-    app.run_polling(close_loop=False)
+    app.run_polling()
 
 
 if __name__ == "__main__":
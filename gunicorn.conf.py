@@ -0,0 +1,18 @@
+# gunicorn.conf.py — запуск backend в проде: gunicorn backend.main:app
+# (файл gunicorn подхватывает сам из текущей директории)
+import multiprocessing
+import os
+
+# uvicorn внутри каждого процесса: ASGI + uvloop/httptools
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Число процессов: WEB_CONCURRENCY, иначе 2×CPU+1, но не больше 4 — у каждого
+# воркера свой пул БД, и бюджет соединений (DB_MAX_CONNS в backend/main.py)
+# делится на это же число; выражение там должно совпадать с этим.
+# preload_app не включаем: движок и пул БД создаются при импорте backend.main —
+# так у каждого воркера свои соединения asyncpg, а не унаследованные через fork.
+workers = int(os.getenv("WEB_CONCURRENCY") or min(multiprocessing.cpu_count() * 2 + 1, 4))
+
+keepalive = 5   # секунд держим keep-alive соединение от прокси между запросами
+timeout = 30    # зависший воркер перезапускается
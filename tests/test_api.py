@@ -0,0 +1,131 @@
+# tests/test_api.py
+# Проверки разбора тела запроса без БД: сессия и админ-доступ подменены,
+# до обращения к БД эти запросы не доходят (падают на валидации) либо
+# попадают в FakeSession, которая запоминает INSERT/UPDATE вместо выполнения.
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from backend import api
+from backend.main import app
+from backend.models import Product
+
+
+def _product(**kw):
+    return Product(**{
+        "id": 1, "title": "Чай", "slug": "chai", "description": None,
+        "price": 100, "currency": "RUB", "stock": 5, "is_active": True,
+        "images": None, "attributes": None, "category_id": 1, **kw,
+    })
+
+
+class FakeSession:
+    def __init__(self):
+        self.values = None  # параметры последнего INSERT/UPDATE; None — их не было
+        self.scalar_result = None  # ответ session.scalar(...)
+
+    async def get(self, model, pk):
+        return _product(id=pk)
+
+    async def execute(self, stmt):
+        self.values = {c.key: v.value for c, v in stmt._values.items()}
+        p = _product(**self.values)
+        return type("R", (), {"scalar_one_or_none": lambda _: p, "scalar_one": lambda _: p})()
+
+    async def scalar(self, stmt):
+        return self.scalar_result
+
+    async def commit(self):
+        pass
+
+    def begin(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[api.get_session] = lambda: None
+    app.dependency_overrides[api.require_admin] = lambda: 1
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_create_product_non_utf8_json_is_422(client):
+    r = client.post(
+        "/api/products",
+        content=b'{"title":"\xff"}',
+        headers={"content-type": "application/json"},
+    )
+    assert r.status_code == 422
+    err = r.json()["detail"][0]
+    assert err["type"] == "json_invalid"
+    assert "input" not in err
+
+
+def test_create_product_form_defaults(client):
+    # неотмеченный чекбокс в форму не попадает: товар создаётся неактивным, цена 0
+    session = FakeSession()
+    app.dependency_overrides[api.get_session] = lambda: session
+    r = client.post("/api/products", data={"title": "Чай", "category_id": "1"})
+    assert r.status_code == 201
+    assert session.values["is_active"] is False
+    assert session.values["price"] == Decimal("0.0")
+
+
+def test_patch_product_form_empty_fields_are_not_changed(client):
+    session = FakeSession()
+    app.dependency_overrides[api.get_session] = lambda: session
+    r = client.patch("/api/products/1", data={"price": "", "stock": "", "is_active": ""})
+    assert r.status_code == 200
+    assert session.values is None
+    assert (r.json()["price"], r.json()["stock"], r.json()["is_active"]) == (100, 5, True)
+
+
+def test_patch_product_form_values_are_applied(client):
+    session = FakeSession()
+    app.dependency_overrides[api.get_session] = lambda: session
+    r = client.patch("/api/products/1", data={"price": "12,5", "stock": "", "is_active": "0"})
+    assert r.status_code == 200
+    assert session.values == {"price": Decimal("12.5"), "is_active": False}
+
+
+def test_category_subtree_cte_stops_on_cycle():
+    # UNION (не UNION ALL) отбрасывает повторные id: цикл в parent_id не зацикливает рекурсию
+    sql = str(api.select(api.category_subtree_cte(1).c.id).compile(dialect=postgresql.dialect()))
+    assert "UNION" in sql and "UNION ALL" not in sql
+
+
+def test_patch_category_rejects_cycle(client):
+    # новый родитель — потомок самой категории (предки родителя содержат category_id)
+    session = FakeSession()
+    session.scalar_result = 1
+    app.dependency_overrides[api.get_session] = lambda: session
+    r = client.patch("/api/categories/1", json={"parent_id": 3})
+    assert r.status_code == 422
+    assert session.values is None
+
+
+@pytest.mark.parametrize("title", ["", "   "])
+def test_patch_product_blank_title_is_422(client, title):
+    session = FakeSession()
+    app.dependency_overrides[api.get_session] = lambda: session
+    r = client.patch("/api/products/1", data={"title": title})
+    assert r.status_code == 422
+    assert session.values is None
+
+
+def test_product_row_normalizes_images_like_product_out():
+    # строка из _PRODUCT_COLUMNS (GET) и ProductOut (create/update) дают одни и те же images
+    raw = {"images": [" http://x ", "", 5]}
+    assert api._product_row(raw)["images"] == ["http://x", "5"]
+    assert api.ProductOut.model_validate(_product(**raw)).images == ["http://x", "5"]
@@ -0,0 +1,22 @@
+# tests/test_main.py
+# Главная страница: сжатый/несжатый вариант по Accept-Encoding, БД не нужна.
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import _ROOT_HTML, app
+
+
+@pytest.mark.parametrize("accept, gzipped", [
+    ("gzip, deflate, br", True),
+    ("br;q=1.0, gzip;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("identity", False),
+    ("br, *;q=0", False),
+])
+def test_root_honours_accept_encoding(accept, gzipped):
+    r = TestClient(app).get("/", headers={"accept-encoding": accept})
+    assert r.status_code == 200
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert (r.headers.get("content-encoding") == "gzip") is gzipped
+    assert r.content == _ROOT_HTML  # httpx сам распаковывает gzip